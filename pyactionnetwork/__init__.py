@@ -22,4 +22,4 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 THE SOFTWARE.
 """
 
-from .api import ActionNetworkApi  # noqa
+from .api import ActionNetworkApi, ActionNetworkApiError  # noqa
@@ -1,10 +1,51 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import logging
+import threading
+
 import requests
-from urllib.parse import quote
-from ratelimit import limits, RateLimitException
-from backoff import on_exception, expo
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from ratelimit import limits, sleep_and_retry
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover
+    ijson = None
+
+try:
+    from orjson import dumps as json_dumps, loads as json_loads
+except ImportError:  # pragma: no cover
+    from json import dumps as json_dumps, loads as json_loads
+
+logger = logging.getLogger(__name__)
+
+# Number of pages fetched concurrently; matches the API's 4 calls per second.
+MAX_WORKERS = 4
+
+# GET responses are reused for this many seconds unless the resource is modified.
+CACHE_TTL = 60
+CACHE_MAXSIZE = 1024
+
+CONFIG_URL = "https://actionnetwork.org/api/v2/"
+
+# Curie prefix on OSDI link relations and embedded collections, e.g. 'osdi:people'.
+OSDI_PREFIX = 'osdi:'
+
+# Entry point responses and their validators, shared by every client in the
+# process and keyed by API token.
+_config_cache = {}
+
+
+class ActionNetworkApiError(Exception):
+    """Raised when the API answers a paginated request with an error body."""
+
+    def __init__(self, error):
+        super().__init__(error)
+        self.error = error
 
 
 class ActionNetworkApi:
@@ -13,14 +54,68 @@ class ActionNetworkApi:
     def __init__(self, api_key, **kwargs):
         """Instantiate the API client and get config."""
         self.headers = {"OSDI-API-Token": api_key}
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=10,
+                              pool_maxsize=10,
+                              max_retries=Retry(total=3,
+                                                backoff_factor=0.25,
+                                                status_forcelist=[429, 500, 502, 503, 504],
+                                                raise_on_status=False))
+        self.session.mount("https://", adapter)
+        self._cache = TTLCache(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL)
+        self._cache_lock = threading.Lock()
         self.refresh_config()
-        self.base_url = self.config.get('links', {}).get('self', 'https://actionnetwork.org/api/v2/')
-        print(self.config['motd'])
+        self.base_url = self._resource_map.get('self', CONFIG_URL)
+        self._people_url = f"{self.base_url}people/"
+        logger.info("MOTD: %s", self.config.get('motd'))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close the pooled connections held by the session."""
+        self.session.close()
 
     def refresh_config(self):
-        """Get a new version of the base_url config."""
-        self.config = requests.get(url="https://actionnetwork.org/api/v2/",
-                                   headers=self.headers).json()
+        """Get a new version of the base_url config.
+
+        A previously fetched config is revalidated with its ETag/Last-Modified
+        and reused as-is when the API answers 304 Not Modified.
+        """
+        token = self.headers["OSDI-API-Token"]
+        cached = _config_cache.get(token)
+        headers = {}
+        if cached:
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        resp = self.session.get(url=CONFIG_URL, headers=headers)
+        if cached and resp.status_code == 304:
+            self.config = cached['config']
+        else:
+            self.config = json_loads(resp.content)
+            etag = resp.headers.get('ETag')
+            last_modified = resp.headers.get('Last-Modified')
+            if etag or last_modified:
+                _config_cache[token] = {
+                    'etag': etag,
+                    'last_modified': last_modified,
+                    'config': self.config,
+                }
+
+        self._resource_map = {}
+        for name, link in (self.config.get('_links') or {}).items():
+            if not isinstance(link, dict) or 'href' not in link:
+                continue
+            self._resource_map[name] = link['href']
+            if name.startswith(OSDI_PREFIX):
+                self._resource_map.setdefault(name[len(OSDI_PREFIX):], link['href'])
 
     def resource_to_url(self, resource):
         """Convert a named endpoint into a URL.
@@ -31,19 +126,85 @@ class ActionNetworkApi:
         Returns:
             (str) Full resource endpoint URL.
         """
-        if resource in self.config.get('_links', {}).keys():
-            return self.config['_links'][resource]['href']
         try:
-            return self.config['_links']["osdi:{0}".format(resource)]['href']
+            return self._resource_map[resource]
         except KeyError:
             raise KeyError("Unknown Resource %s", resource)
 
     # Action Network has a 4 per second rate limit, see
     # https://actionnetwork.org/docs/#considerations
-    @on_exception(expo, RateLimitException, max_tries=8)
+    # Callers over the limit block until the current window ends, so threads
+    # sharing an instance are spaced out at exactly the permitted rate.
+    @sleep_and_retry
     @limits(calls=4, period=1)
+    def _send(self, method, url, **kwargs):
+        return self.session.request(method, url, **kwargs)
+
+    def _fetch(self, method, url, params=None, json=None):
+        data = headers = None
+        if json is not None:
+            data = json_dumps(json)
+            headers = {'Content-Type': 'application/json'}
+        return self._send(method, url, params=params, data=data, headers=headers).content
+
+    def _request(self, method, url, params=None, json=None):
+        return json_loads(self._fetch(method, url, params=params, json=json))
+
     def client(self, method, url, params=None, json=None):
-        return requests.request(method, url, headers=self.headers, params=params, json=json).json()
+        """Make an API request and return the decoded response.
+
+        GET responses are cached for `CACHE_TTL` seconds; any other request
+        drops the cached responses for the collection it modifies. The raw
+        body is cached and decoded on every hit, so callers always get their
+        own objects and changing a result never alters the cache.
+        """
+        if method != 'GET' or json is not None:
+            resp = self._request(method, url, params=params, json=json)
+            self._invalidate(url)
+            return resp
+
+        key = self._cache_key(method, url, params)
+        if key is None:
+            return self._request(method, url, params=params)
+
+        with self._cache_lock:
+            content = self._cache.get(key)
+        if content is not None:
+            return json_loads(content)
+        content = self._fetch(method, url, params=params)
+        resp = json_loads(content)
+        if not resp.get('error', None):
+            with self._cache_lock:
+                self._cache[key] = content
+        return resp
+
+    def _cache_key(self, method, url, params):
+        """Build a hashable cache key, or `None` if `params` can't be cached."""
+        if params is None:
+            params = {}
+        if not isinstance(params, dict):
+            return None
+        key = (method, url, tuple(sorted(
+            (name, tuple(value) if isinstance(value, list) else value)
+            for name, value in params.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def _invalidate(self, url):
+        """Drop cached responses for the collection `url` belongs to."""
+        path = url[len(self.base_url):] if url.startswith(self.base_url) else ''
+        prefix = self.base_url + path.split('/')[0].split('?')[0]
+        with self._cache_lock:
+            for key in [key for key in self._cache if key[1].startswith(prefix)]:
+                del self._cache[key]
+
+    def cache_clear(self):
+        """Forget every cached GET response."""
+        with self._cache_lock:
+            self._cache.clear()
 
     def get_resource(self, resource, params={}):
         """Get a resource endpoint by name.
@@ -57,29 +218,137 @@ class ActionNetworkApi:
         url = self.resource_to_url(resource)
         return self.client('GET', url, params=params)
 
-    def get_resource_list(self, resource=None, url=None, filter=None, resources=None):
-        if not resources:
-            resources = []
+    def get_resource_list(self, resource, url=None, filter=None):
+        """Get every item of a paginated resource.
+
+        When the first page reports `total_pages`, the remaining pages are
+        requested concurrently rather than by following `next` links one by one.
+        Pages bypass the GET cache.
 
-        if resource and not url:
-            url_no_filter = self.resource_to_url(resource)
+        Args:
+            resource (str):
+                Resource endpoint of the format 'people', 'events', 'lists', etc.
+            url (str, optional):
+                URL to fetch instead of the resource's default endpoint. `resource`
+                is still required to name the embedded collection.
+            filter (str, optional):
+                OData filter to apply, e.g. "email eq 'jane@example.com'".
+        Returns:
+            (list) Embedded items from every page.
+        Raises:
+            ActionNetworkApiError: if the API returns an error for any page.
+        """
+        key = OSDI_PREFIX + resource
+        first_page = False
+        params = {}
+        if not url:
+            first_page = True
+            url = self.resource_to_url(resource)
             if filter:
-                url = f"{url_no_filter}?filter={quote(filter)}"
-            else:
-                url = url_no_filter
+                params['filter'] = filter
 
-        data = self.client('GET', url)
-        if data.get('error', None):
-            print(data['error'])
-            data = self.client('GET', url_no_filter)
+        # Transient 429/5xx responses are already retried by the session.
+        data = self._check_page(self._request('GET', url, params=params))
+
+        resources = list(data['_embedded'][key])
 
-        resources += [d for d in data['_embedded'][f'osdi:{resource}']]
+        total_pages = data.get('total_pages') or 1
+        if first_page and total_pages > 1:
+            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+                pages = pool.map(lambda page: self._request('GET', url, params={**params, 'page': page}),
+                                 range(2, total_pages + 1))
+                for page in pages:
+                    resources.extend(self._check_page(page)['_embedded'][key])
+            return resources
 
-        if data.get('_links', {}).get('next', None):
-            next_url = data.get('_links').get('next').get('href')
-            return self.get_resource_list(url=next_url, resource=resource, resources=resources)
+        next_url = data.get('_links', {}).get('next', {}).get('href')
+        if next_url:
+            resources.extend(self.iter_resource(resource, url=next_url))
         return resources
 
+    def _check_page(self, data):
+        """Return a decoded page, raising if the API answered with an error."""
+        if data.get('error', None):
+            raise ActionNetworkApiError(data['error'])
+        return data
+
+    def iter_resource(self, resource, filter=None, url=None):
+        """Lazily yield every item of a paginated resource.
+
+        Pages are requested only as items are consumed, so a caller that stops
+        early never fetches the remaining pages. Pages bypass the GET cache, so
+        only the current one is held in memory.
+
+        Args:
+            resource (str):
+                Resource endpoint of the format 'people', 'events', 'lists', etc.
+            filter (str, optional):
+                OData filter to apply, e.g. "email eq 'jane@example.com'".
+            url (str, optional):
+                URL of the first page to fetch instead of the resource's default
+                endpoint. `resource` is still required to name the embedded collection.
+        Yields:
+            (dict) Embedded items, one at a time.
+        Raises:
+            ActionNetworkApiError: if the API returns an error for any page.
+        """
+        params = None
+        if not url:
+            url = self.resource_to_url(resource)
+            if filter:
+                params = {'filter': filter}
+
+        key = OSDI_PREFIX + resource
+        while url:
+            data = self._check_page(self._request('GET', url, params=params))
+            yield from data['_embedded'][key]
+            # `next` links already carry the filter in their query string.
+            url, params = data.get('_links', {}).get('next', {}).get('href'), None
+
+    def iter_resource_fields(self, resource, fields, filter=None):
+        """Lazily yield selected fields of every item of a paginated resource.
+
+        Pages are parsed as they stream in with `ijson`, so only one item is
+        held in memory at a time. Responses are not cached. Requires the
+        optional `ijson` package.
+
+        Args:
+            resource (str):
+                Resource endpoint of the format 'people', 'events', 'lists', etc.
+            fields (list):
+                Top-level item fields to keep, e.g. ['given_name', 'email_addresses'].
+            filter (str, optional):
+                OData filter to apply, e.g. "email eq 'jane@example.com'".
+        Yields:
+            (dict) The requested fields of each item, `None` where missing.
+        Raises:
+            ActionNetworkApiError: if the API returns an error for any page.
+        """
+        if ijson is None:
+            raise ImportError("iter_resource_fields requires the ijson package")
+
+        url = self.resource_to_url(resource)
+        params = {'filter': filter} if filter else None
+        item_prefix = f'_embedded.{OSDI_PREFIX}{resource}.item'
+        while url:
+            with self._send('GET', url, params=params, stream=True) as resp:
+                resp.raw.decode_content = True
+                url, params = None, None
+                builder = None
+                for prefix, event, value in ijson.parse(resp.raw, use_float=True):
+                    if builder is not None:
+                        builder.event(event, value)
+                        if prefix == item_prefix and event == 'end_map':
+                            yield {field: builder.value.get(field) for field in fields}
+                            builder = None
+                    elif prefix == item_prefix and event == 'start_map':
+                        builder = ijson.ObjectBuilder()
+                        builder.event(event, value)
+                    elif prefix == '_links.next.href':
+                        url = value
+                    elif prefix == 'error' and event == 'string':
+                        raise ActionNetworkApiError(value)
+
     def get_person(self, person_id=None, search_by='email', search_string=None):
         """Search for a user.
 
@@ -91,29 +360,32 @@ class ActionNetworkApi:
 
         Returns:
             (dict) person json if found, otherwise `None`
+        Raises:
+            ValueError: if neither `person_id` nor `search_string` is given.
         """
         if person_id:
-            url = "{0}people/{1}".format(self.base_url, person_id)
+            url = f"{self._people_url}{person_id}"
+            params = None
+        elif search_string is None:
+            raise ValueError("get_person requires a person_id or a search_string")
         else:
-            url = "{0}people/?filter={1} eq '{2}'".format(
-                self.base_url,
-                search_by,
-                quote(search_string))
+            url = self._people_url
+            params = {'filter': f"{search_by} eq '{search_string}'"}
 
-        person = self.client('GET', url)
+        person = self.client('GET', url, params=params)
         return person
 
     def create_person(self,
                       email=None,
                       given_name='',
                       family_name='',
-                      address=list(),
+                      address=None,
                       city='',
                       state='',
                       country='',
                       postal_code='',
-                      tags=list(),
-                      custom_fields=dict()):
+                      tags=None,
+                      custom_fields=None):
         """Create a user.
 
         Documentation here: https://actionnetwork.org/docs/v2/person_signup_helper
@@ -144,13 +416,53 @@ class ActionNetworkApi:
             containing the above attributes and additional attributes
             set by Action Network.
         """
-        url = "{0}people/".format(self.base_url)
-        payload = {
+        payload = self._build_person_payload(email=email,
+                                             given_name=given_name,
+                                             family_name=family_name,
+                                             address=address,
+                                             city=city,
+                                             state=state,
+                                             country=country,
+                                             postal_code=postal_code,
+                                             tags=tags,
+                                             custom_fields=custom_fields)
+        resp = self.client('POST', self._people_url, json=payload)
+        return resp
+
+    def create_people(self, people):
+        """Create several users, sending the requests concurrently.
+
+        Requests share the client's rate limit, so at most 4 are made per second.
+
+        Args:
+            people (list):
+                dicts of keyword arguments accepted by `create_person`.
+        Returns:
+            (list) API responses, in the same order as `people`.
+        """
+        payloads = [self._build_person_payload(**person) for person in people]
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            return list(pool.map(lambda payload: self.client('POST', self._people_url, json=payload),
+                                 payloads))
+
+    def _build_person_payload(self,
+                              email=None,
+                              given_name='',
+                              family_name='',
+                              address=None,
+                              city='',
+                              state='',
+                              country='',
+                              postal_code='',
+                              tags=None,
+                              custom_fields=None):
+        """Build the person signup helper payload for `create_person`."""
+        return {
             'person': {
                 'family_name': family_name,
                 'given_name': given_name,
                 'postal_addresses': [{
-                    'address_lines': list(address),
+                    'address_lines': [address] if isinstance(address, str) else address or [],
                     'locality': city,
                     'region': state,
                     'country': country,
@@ -159,26 +471,23 @@ class ActionNetworkApi:
                 'email_addresses': [{
                     'address': email
                 }],
-                'custom_fields': custom_fields,
+                'custom_fields': custom_fields or {},
             },
-            'add_tags': list(tags)
+            'add_tags': [tags] if isinstance(tags, str) else tags or []
         }
 
-        resp = self.client('POST', url, json=payload)
-        return resp
-
     def update_person(self,
                       person_id=None,
                       email=None,
                       given_name=None,
                       family_name=None,
-                      address=list(),
+                      address=None,
                       city=None,
                       state=None,
                       country=None,
                       postal_code=None,
-                      tags=list(),
-                      custom_fields=dict()):
+                      tags=None,
+                      custom_fields=None):
         """Update a user.
 
         Args:
@@ -206,26 +515,28 @@ class ActionNetworkApi:
             (dict) A fully fleshed out dictionary representing a person, containing the above
             attributes and additional attributes set by Action Network.
         """
-        url = "{0}people/{1}".format(self.base_url, person_id)
+        url = f"{self._people_url}{person_id}"
+        postal_address = {
+            'address_lines': [address] if isinstance(address, str) else address or None,
+            'locality': city,
+            'region': state,
+            'country': country,
+            'postal_code': postal_code
+        }
+        postal_address = {k: v for k, v in postal_address.items() if v is not None}
         payload = {
             'family_name': family_name,
             'given_name': given_name,
-            'postal_addresses': [{
-                'address_lines': list(address),
-                'locality': city,
-                'region': state,
-                'country': country,
-                'postal_code': postal_code
-            }],
-            'email_addresses': [{
-                'address': email
-            }],
-            'add_tags': list(tags),
+            'postal_addresses': [postal_address] if postal_address else None,
+            'email_addresses': [{'address': email}] if email else None,
+            'add_tags': [tags] if isinstance(tags, str) else tags or None,
             'custom_fields': custom_fields,
         }
+        # Only send the fields being updated so unset ones are left untouched.
+        payload = {k: v for k, v in payload.items() if v is not None}
 
         resp = self.client('PUT', url, json=payload)
-        return resp.json()
+        return resp
 
     def search(self, resource, operator, term):
         """Search for a given `term` within a `resource`.
@@ -1,8 +1,6 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import requests
-
 from .models import Donation
 
 
@@ -24,7 +22,7 @@ def get_all_donations(api=None, donations=None, url="https://actionnetwork.org/a
     if not donations:
         donations = []
 
-    data = requests.get(url=url, headers=api.headers)
+    data = api.session.get(url=url)
     donations += [Donation(data=d) for d in data.json()['_embedded']['osdi:donations']]
 
     if data.json().get('_links', {}).get('next', None):
@@ -5,6 +5,7 @@ import pytest
 import re
 import responses
 import json
+from urllib.parse import parse_qs, urlparse
 
 import pyactionnetwork
 from responses import GET, POST, PUT
@@ -20,6 +21,30 @@ def get_api():
     return pyactionnetwork.ActionNetworkApi(api_key="test")
 
 
+def paged_callback(total_pages=None, next_until=None, error_page=None, item=None):
+    """Build a `responses` callback serving one person per `page` query param.
+
+    Args:
+        total_pages (int, optional): reported as `total_pages` in every page.
+        next_until (int, optional): add `next` links on pages before this one.
+        error_page (int, optional): page answered with a 400 error body.
+        item (dict, optional): extra fields for each embedded person.
+    """
+    def callback(request):
+        page = int(parse_qs(urlparse(request.url).query).get('page', ['1'])[0])
+        if page == error_page:
+            return (400, {}, json.dumps({'error': 'Page out of range'}))
+        person = dict(item or {}, given_name='Test {0}'.format(page))
+        body = {'_embedded': {'osdi:people': [person]}}
+        if total_pages:
+            body.update(total_pages=total_pages, page=page)
+        if next_until and page < next_until:
+            next_url = 'https://actionnetwork.org/api/v2/people?page={0}'.format(page + 1)
+            body['_links'] = {'next': {'href': next_url}}
+        return (200, {}, json.dumps(body))
+    return callback
+
+
 def test_api_creation():
     api = get_api()
     assert 'motd' in api.config
@@ -147,5 +172,210 @@ def test_get_person():
         assert len(resp['_embedded']['osdi:people']) == 1
         assert resp['_embedded']['osdi:people'][0]['given_name'] == 'jane'
         assert resp['_embedded']['osdi:people'][0]['family_name'] == 'doe'
-        assert responses.calls[0].request.url == "https://actionnetwork.org/api/v2/people/?filter=email%20eq%20'jane%40example.com'"  # noqa
+        assert responses.calls[0].request.url == "https://actionnetwork.org/api/v2/people/?filter=email+eq+%27jane%40example.com%27"  # noqa
     test()
+
+    with pytest.raises(ValueError):
+        api.get_person()
+
+
+def test_get_resource_list():
+    api = get_api()
+
+    with responses.RequestsMock() as resps:
+        resps.add_callback(GET, DEFAULT_URL, callback=paged_callback(total_pages=3))
+        people = api.get_resource_list('people', filter="family_name eq 'User'")
+        assert len(resps.calls) == 3
+        for call in resps.calls:
+            assert parse_qs(urlparse(call.request.url).query)['filter'] == ["family_name eq 'User'"]
+    assert [p['given_name'] for p in people] == ['Test 1', 'Test 2', 'Test 3']
+    assert len(api._cache) == 0
+
+
+def test_client_caches_get():
+    api = get_api()
+
+    with responses.RequestsMock() as resps:
+        with open('test_data/people.json', 'r') as f:
+            resps.add(GET, DEFAULT_URL, f.read())
+        resps.add(POST, 'https://actionnetwork.org/api/v2/people/', '{}')
+        api.get_resource('people')
+        api.get_resource('people')
+        assert len(resps.calls) == 1
+
+        api.create_person(email='john.doe@example.com')
+        api.get_resource('people')
+        assert len(resps.calls) == 3
+
+        api.cache_clear()
+        api.get_resource('people')
+        assert len(resps.calls) == 4
+
+        resp = api.get_resource('people')
+        resp['_embedded'] = None
+        assert api.get_resource('people')['_embedded'] is not None
+        assert len(resps.calls) == 4
+
+        api.get_resource('people', params={'page': [1]})
+        api.get_resource('people', params={'page': [1]})
+        assert len(resps.calls) == 5
+
+
+def test_get_resource_list_page_error():
+    api = get_api()
+
+    with responses.RequestsMock() as resps:
+        resps.add_callback(GET, DEFAULT_URL, callback=paged_callback(total_pages=3, error_page=2))
+        with pytest.raises(pyactionnetwork.ActionNetworkApiError) as excinfo:
+            api.get_resource_list('people')
+    assert excinfo.value.error == 'Page out of range'
+
+
+def test_get_resource_list_follows_next_links():
+    api = get_api()
+
+    with responses.RequestsMock() as resps:
+        resps.add_callback(GET, DEFAULT_URL, callback=paged_callback(next_until=3))
+        people = api.get_resource_list('people')
+    assert [p['given_name'] for p in people] == ['Test 1', 'Test 2', 'Test 3']
+    assert len(api._cache) == 0
+
+
+def test_create_people():
+    api = get_api()
+
+    people = [
+        {'given_name': 'John', 'email': 'john.doe@example.com'},
+        {'given_name': 'Jane', 'email': 'jane.doe@example.com', 'tags': ['volunteer']},
+    ]
+
+    def callback(request):
+        payload = json.loads(request.body)
+        return (200, {}, json.dumps(payload))
+
+    with responses.RequestsMock() as resps:
+        resps.add_callback(
+            POST,
+            'https://actionnetwork.org/api/v2/people/',
+            callback=callback)
+        created = api.create_people(people)
+        assert len(resps.calls) == 2
+
+    assert [p['person']['given_name'] for p in created] == ['John', 'Jane']
+    assert created[1]['add_tags'] == ['volunteer']
+
+
+def test_update_person_omits_unset_fields():
+    api = get_api()
+
+    def callback(request):
+        payload = json.loads(request.body)
+        assert payload == {
+            'given_name': 'Johnny',
+            'postal_addresses': [{'locality': 'Pittsburgh'}],
+        }
+        return (200, {}, json.dumps(payload))
+
+    with responses.RequestsMock() as resps:
+        resps.add_callback(
+            PUT,
+            'https://actionnetwork.org/api/v2/people/0',
+            callback=callback)
+        resp = api.update_person(person_id=0, given_name='Johnny', city='Pittsburgh')
+    assert resp['given_name'] == 'Johnny'
+
+
+def test_iter_resource():
+    api = get_api()
+
+    with responses.RequestsMock() as resps:
+        resps.add_callback(GET, DEFAULT_URL, callback=paged_callback(next_until=10))
+        people = api.iter_resource('people')
+        assert next(people)['given_name'] == 'Test 1'
+        assert next(people)['given_name'] == 'Test 2'
+        assert len(resps.calls) == 2
+    assert len(api._cache) == 0
+
+
+def test_refresh_config_reuses_unmodified_config(monkeypatch):
+    monkeypatch.setattr(pyactionnetwork.api, '_config_cache', {})
+    with open('test_data/self.json', 'r') as f:
+        config = f.read()
+
+    with responses.RequestsMock() as resps:
+        resps.add(GET, DEFAULT_URL, config, headers={'ETag': '"abc"'})
+        pyactionnetwork.ActionNetworkApi(api_key="etag-test")
+
+    with responses.RequestsMock() as resps:
+        resps.add(GET, DEFAULT_URL, '', status=304)
+        api = pyactionnetwork.ActionNetworkApi(api_key="etag-test")
+        assert resps.calls[0].request.headers['If-None-Match'] == '"abc"'
+
+    assert 'motd' in api.config
+    assert api.resource_to_url('people') == 'https://actionnetwork.org/api/v2/people'
+
+
+def test_get_resource_list_error():
+    api = get_api()
+
+    with responses.RequestsMock() as resps:
+        resps.add(GET, DEFAULT_URL, json.dumps({'error': 'Invalid filter'}), status=400)
+        with pytest.raises(pyactionnetwork.ActionNetworkApiError) as excinfo:
+            api.get_resource_list('people', filter='bad')
+        assert excinfo.value.error == 'Invalid filter'
+        assert len(resps.calls) == 1
+
+        with pytest.raises(pyactionnetwork.ActionNetworkApiError):
+            next(api.iter_resource('people', filter='bad'))
+
+
+def test_iter_resource_fields_error():
+    pytest.importorskip('ijson')
+    api = get_api()
+
+    with responses.RequestsMock() as resps:
+        resps.add(GET, DEFAULT_URL, json.dumps({'error': 'API Key invalid or not present'}), status=401)
+        with pytest.raises(pyactionnetwork.ActionNetworkApiError) as excinfo:
+            list(api.iter_resource_fields('people', ['given_name']))
+        assert excinfo.value.error == 'API Key invalid or not present'
+
+
+def test_api_context_manager(monkeypatch):
+    closed = []
+    with get_api() as api:
+        assert isinstance(api, pyactionnetwork.ActionNetworkApi)
+        monkeypatch.setattr(api.session, 'close', lambda: closed.append(True))
+    assert closed == [True]
+
+
+def test_iter_resource_fields():
+    pytest.importorskip('ijson')
+    api = get_api()
+
+    with responses.RequestsMock() as resps:
+        item = {'family_name': 'User', 'latitude': 39.95, '_links': {}}
+        resps.add_callback(GET, DEFAULT_URL, callback=paged_callback(next_until=2, item=item))
+        people = list(api.iter_resource_fields('people', ['given_name', 'latitude', 'email_addresses']))
+
+    assert people == [
+        {'given_name': 'Test 1', 'latitude': 39.95, 'email_addresses': None},
+        {'given_name': 'Test 2', 'latitude': 39.95, 'email_addresses': None},
+    ]
+    assert all(type(p['latitude']) is float for p in people)
+
+
+def test_create_person_single_address_line_and_tag():
+    api = get_api()
+
+    def callback(request):
+        payload = json.loads(request.body)
+        assert payload['person']['postal_addresses'][0]['address_lines'] == ['800 Nowhere St.']
+        assert payload['add_tags'] == ['volunteer']
+        return (200, {}, json.dumps(payload))
+
+    with responses.RequestsMock() as resps:
+        resps.add_callback(
+            POST,
+            'https://actionnetwork.org/api/v2/people/',
+            callback=callback)
+        api.create_person(email='john.doe@example.com', address='800 Nowhere St.', tags='volunteer')